@@ -2,8 +2,8 @@ import numpy as np
 from credmark.cmf.model import Model, ModelDataErrorDesc
 from credmark.cmf.model.errors import ModelDataError, ModelRunError
 from credmark.cmf.types import Address, Contract, Maybe, Network, Price, PriceWithQuote, Token
-from models.credmark.protocols.dexes.curve.curve_finance import \
-    CurveFiPoolInfoToken
+from models.credmark.protocols.dexes.curve.curve_finance import (
+    CurveFiPoolInfoToken, get_registry)
 
 np.seterr(all='raise')
 
@@ -37,7 +37,7 @@ class CurveFinanceMaybePrice(Model):
 
 
 @Model.describe(slug="price.dex-curve-fi",
-                version="1.6",
+                version="1.7",
                 display_name="Curve Finance Pool - Price for stablecoins and LP",
                 description="For those tokens primarily traded in curve",
                 category='protocol',
@@ -171,7 +171,7 @@ class CurveFinancePrice(Model):
             if input.abi is not None and 'minter' in input.abi.functions:
                 pool_addr = input.functions.minter().call()
             else:
-                registry = Contract(**self.context.models.curve_fi.get_registry())
+                registry = get_registry(self.context)
                 pool_addr = registry.functions.get_pool_from_lp_token(input.address.checksum).call()
             pool = Contract(address=Address(pool_addr))
             pool_info = self.context.run_model('curve-fi.pool-info-tokens',
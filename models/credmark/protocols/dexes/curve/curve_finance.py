@@ -1,6 +1,7 @@
 # pylint: disable=locally-disabled, unused-import
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -14,12 +15,18 @@ from credmark.dto import DTO, EmptyInput
 from credmark.cmf.types.series import BlockSeries
 from models.credmark.tokens.token import fix_erc20_token
 from models.dtos.tvl import TVLInfo
-from models.tmp_abi_lookup import CURVE_VYPER_POOL
+from models.tmp_abi_lookup import CURVE_VYPER_POOL, ERC_20_ABI
+from models.utils.multicall import get_multicall, try_aggregate, try_calls
 from web3.exceptions import (ABIFunctionNotFound, BadFunctionCallOutput,
                              ContractLogicError)
 
 np.seterr(all='raise')
 
+ETH_PSEUDO_ADDRESS = Address('0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE')
+
+WAD = 10**18
+VIRTUAL_PRICE_DEFAULT = WAD
+
 GAUGE_ABI_LP_TOKEN = '[{"stateMutability":"view","type":"function","name":"lp_token","inputs":[],"outputs":[{"name":"","type":"address"}],"gas":3168}]'  # pylint:disable=line-too-long
 
 
@@ -47,6 +54,74 @@ class CurveFiPoolInfo(CurveFiPoolInfoToken):
     gauges_type: List[int]
 
 
+# (chain_id, block_number) => registry contract / gauge controller address,
+# shared by all model runs in this process
+CURVE_REGISTRY_CACHE = {}
+CURVE_GAUGE_CONTROLLER_CACHE = {}
+CURVE_ADDRESS_CACHE_SIZE = 1024
+
+
+def get_registry(context) -> Contract:
+    """
+    Registry contract with its ABI loaded, one instance per chain and block
+    """
+    key = (context.chain_id, int(context.block_number))
+    if key not in CURVE_REGISTRY_CACHE:
+        if len(CURVE_REGISTRY_CACHE) >= CURVE_ADDRESS_CACHE_SIZE:
+            CURVE_REGISTRY_CACHE.clear()
+        provider = Contract(**context.models.curve_fi.get_provider())
+        reg_addr = provider.functions.get_registry().call()
+        registry = Contract(address=Address(reg_addr).checksum)
+        _ = registry.abi
+        CURVE_REGISTRY_CACHE[key] = registry
+    return CURVE_REGISTRY_CACHE[key]
+
+
+def get_gauge_controller_address(context) -> Address:
+    key = (context.chain_id, int(context.block_number))
+    if key not in CURVE_GAUGE_CONTROLLER_CACHE:
+        if len(CURVE_GAUGE_CONTROLLER_CACHE) >= CURVE_ADDRESS_CACHE_SIZE:
+            CURVE_GAUGE_CONTROLLER_CACHE.clear()
+        registry = get_registry(context)
+        CURVE_GAUGE_CONTROLLER_CACHE[key] = Address(registry.functions.gauge_controller().call())
+    return CURVE_GAUGE_CONTROLLER_CACHE[key]
+
+
+# (chain_id, block_number, address) => Token with its ABI resolved
+CURVE_TOKEN_CACHE = {}
+CURVE_TOKEN_CACHE_SIZE = 4096
+
+# (chain_id, address) => (symbol, decimals), which do not change once a token is deployed
+CURVE_TOKEN_META_CACHE = {}
+
+
+def get_erc20_token(context, address: Address) -> Token:
+    key = (context.chain_id, int(context.block_number), address)
+    if key not in CURVE_TOKEN_CACHE:
+        if len(CURVE_TOKEN_CACHE) >= CURVE_TOKEN_CACHE_SIZE:
+            CURVE_TOKEN_CACHE.clear()
+        if address == ETH_PSEUDO_ADDRESS:
+            # No contract to look up for the ETH pseudo-address
+            CURVE_TOKEN_CACHE[key] = Token(address=address.checksum, abi=ERC_20_ABI)
+        else:
+            CURVE_TOKEN_CACHE[key] = fix_erc20_token(Token(address=address.checksum))
+    return CURVE_TOKEN_CACHE[key]
+
+
+def get_token_symbol_decimals(context, address: Address) -> Tuple[str, int]:
+    address = Address(address)
+    key = (context.chain_id, address)
+    if key not in CURVE_TOKEN_META_CACHE:
+        if len(CURVE_TOKEN_META_CACHE) >= CURVE_TOKEN_CACHE_SIZE:
+            CURVE_TOKEN_META_CACHE.clear()
+        if address == ETH_PSEUDO_ADDRESS:
+            CURVE_TOKEN_META_CACHE[key] = ('ETH', 18)
+        else:
+            tok = get_erc20_token(context, address)
+            CURVE_TOKEN_META_CACHE[key] = (tok.symbol, tok.decimals)
+    return CURVE_TOKEN_META_CACHE[key]
+
+
 @Model.describe(slug='curve-fi.get-provider',
                 version='1.2',
                 display_name='Curve Finance - Get Provider',
@@ -65,7 +140,7 @@ class CurveFinanceGetProvider(Model):
 
 
 @Model.describe(slug='curve-fi.get-registry',
-                version='1.2',
+                version='1.3',
                 display_name='Curve Finance - Get Registry',
                 description='Query provider to get the registry',
                 category='protocol',
@@ -74,15 +149,11 @@ class CurveFinanceGetProvider(Model):
                 output=Contract)
 class CurveFinanceGetRegistry(Model):
     def run(self, _) -> Contract:
-        provider = Contract(**self.context.models.curve_fi.get_provider())
-        reg_addr = provider.functions.get_registry().call()
-        cc = Contract(address=Address(reg_addr).checksum)
-        _ = cc.abi
-        return cc
+        return get_registry(self.context)
 
 
 @Model.describe(slug="curve-fi.get-gauge-controller",
-                version='1.2',
+                version='1.3',
                 display_name="Curve Finance - Get Gauge Controller",
                 description="Query the registry for the guage controller",
                 category='protocol',
@@ -91,15 +162,13 @@ class CurveFinanceGetRegistry(Model):
                 output=Contract)
 class CurveFinanceGetGauge(Model):
     def run(self, _):
-        registry = Contract(**self.context.models.curve_fi.get_registry())
-        gauge_addr = registry.functions.gauge_controller().call()
-        cc = Contract(address=Address(gauge_addr))
+        cc = Contract(address=get_gauge_controller_address(self.context))
         _ = cc.abi
         return cc
 
 
 @Model.describe(slug="curve-fi.all-pools",
-                version="1.2",
+                version="1.4",
                 display_name="Curve Finance - Get all pools",
                 description="Query the registry for all pools",
                 category='protocol',
@@ -107,21 +176,26 @@ class CurveFinanceGetGauge(Model):
                 output=Contracts)
 class CurveFinanceAllPools(Model):
     def run(self, _) -> Contracts:
-        registry = self.context.run_model('curve-fi.get-registry',
-                                          input=EmptyInput(),
-                                          return_type=Contract)
+        registry = get_registry(self.context)
 
         total_pools = registry.functions.pool_count().call()
+        pool_list = try_aggregate(self.context,
+                                  [(registry, 'pool_list', [i]) for i in range(total_pools)])
+        if pool_list is None:
+            pool_list = [(False, None)] * total_pools
+
         pool_contracts = [None] * total_pools
-        for i in range(0, total_pools):
-            pool_contracts[i] = Contract(address=registry.functions.pool_list(i).call())
+        for i, (success, pool_addr) in enumerate(pool_list):
+            if not success:
+                pool_addr = registry.functions.pool_list(i).call()
+            pool_contracts[i] = Contract(address=pool_addr)
             _ = pool_contracts[i].abi
 
         return Contracts(contracts=pool_contracts)
 
 
 @Model.describe(slug="curve-fi.pool-info-tokens",
-                version="1.10",
+                version="1.19",
                 display_name="Curve Finance Pool - Tokens",
                 description="The amount of Liquidity for Each Token in a Curve Pool",
                 category='protocol',
@@ -129,43 +203,99 @@ class CurveFinanceAllPools(Model):
                 input=Contract,
                 output=CurveFiPoolInfoToken)
 class CurveFinancePoolInfoTokens(Model):
-    @staticmethod
-    def check_token_address(addrs):
+    def check_token_address(self, addrs):
         token_list = Tokens()
         symbols_list = []
 
         for addr in addrs:
             tok_addr = Address(addr)
             if not tok_addr.is_null():
-                tok = Token(address=tok_addr.checksum)
-                tok = fix_erc20_token(tok)
-                symbols_list.append(tok.symbol)
+                tok = get_erc20_token(self.context, tok_addr)
+                symbol, _decimals = get_token_symbol_decimals(self.context, tok_addr)
+                symbols_list.append(symbol)
                 token_list.append(tok)
         return token_list, symbols_list
 
+    def scaled(self, token: Token, amount) -> float:
+        _symbol, decimals = get_token_symbol_decimals(self.context, token.address)
+        return amount / (10 ** decimals)
+
+    def read_pool_coins(self, pool: Contract, n_max: int = 8):
+        """
+        (coin, balance, underlying coin or None) read by index from the pool, up to the
+        first index where coins(i) reverts; in one batch with Multicall3, otherwise one
+        index at a time. A failed batched coin or balance read is re-read directly.
+        """
+        pool_coins = []
+        if get_multicall(self.context) is None:
+            for i in range(n_max):
+                try:
+                    coin = pool.functions.coins(i).call()
+                except ContractLogicError:
+                    break
+                balance = pool.functions.balances(i).call()
+                (_, underlying_coin), = try_calls(self.context,
+                                                  [(pool, 'underlying_coins', [i])])
+                pool_coins.append((coin, balance, underlying_coin))
+            return pool_coins
+
+        fields = ['coins', 'balances', 'underlying_coins']
+        results = try_calls(self.context,
+                            [(pool, field, [i]) for i in range(n_max) for field in fields])
+
+        for i in range(n_max):
+            (coin_ok, coin), (balance_ok, balance), (_, underlying_coin) = \
+                results[i * len(fields):(i + 1) * len(fields)]
+            if not coin_ok:
+                # Only a revert of coins(i) ends the list
+                try:
+                    coin = pool.functions.coins(i).call()
+                except ContractLogicError:
+                    break
+            if not balance_ok:
+                balance = pool.functions.balances(i).call()
+            pool_coins.append((coin, balance, underlying_coin))
+        return pool_coins
+
     def run(self, input: Contract) -> CurveFiPoolInfoToken:
-        registry = Contract(**self.context.models.curve_fi.get_registry())
+        registry = get_registry(self.context)
 
         balances = []
-
-        # Equivalent to input.functions.balances(ii).call()
-        try:
+        balances_token = None
+
+        # Equivalent to input.functions.balances(ii).call() / coins(ii).call()
+        # However, input.functions.underlying_coins(ii).call() is empty for some pools
+        (balances_ok, balances_tokens), (coins_ok, coins), \
+            (underlying_ok, underlying_coins), (lp_token_ok, lp_token_raw), \
+            (admin_balances_ok, admin_balances) = \
+            try_calls(self.context,
+                      [(registry, 'get_balances', [input.address.checksum]),
+                       (registry, 'get_coins', [input.address.checksum]),
+                       (registry, 'get_underlying_coins', [input.address.checksum]),
+                       (registry, 'get_lp_token', [input.address.checksum]),
+                       (registry, 'get_admin_balances', [input.address.checksum])])
+
+        if balances_ok and coins_ok and underlying_ok:
             # Use Registry
-            balances_tokens = registry.functions.get_balances(input.address.checksum).call()
-
-            # Equivalent to input.functions.coins(ii).call()
-            coins = registry.functions.get_coins(input.address.checksum).call()
-            tokens, tokens_symbol = self.__class__.check_token_address(coins)
-
-            # However, input.functions.underlying_coins(ii).call() is empty for some pools
-            underlying_coins = (registry.functions.get_underlying_coins(input.address.checksum)
-                                .call())
-            underlying, underlying_symbol = self.__class__.check_token_address(underlying_coins)
+            tokens, tokens_symbol = self.check_token_address(coins)
+            # Plain pools report their coins as the underlying; lending pools
+            # (is_meta is False for them too) have different underlying coins.
+            if list(underlying_coins) == list(coins):
+                underlying = Tokens(tokens=list(tokens.tokens))
+                underlying_symbol = list(tokens_symbol)
+            else:
+                underlying, underlying_symbol = self.check_token_address(underlying_coins)
             balances_raw = balances_tokens[:len(tokens_symbol)]
 
-            balances = [t.scaled(bal) for bal, t in zip(balances_raw, tokens)]
+            balances = [self.scaled(t, bal) for bal, t in zip(balances_raw, tokens)]
+
+            # The registry's admin balance is the pool's token (or ETH) holding less balances(i)
+            if admin_balances_ok:
+                balances_token = [self.scaled(t, bal + admin_bal)
+                                  for bal, admin_bal, t
+                                  in zip(balances_raw, admin_balances, tokens)]
 
-        except ContractLogicError:
+        else:
             try:
                 _ = input.abi
             except ModelDataError:
@@ -190,23 +320,36 @@ class CurveFinancePoolInfoTokens(Model):
             tokens_symbol = []
             underlying = Tokens()
             underlying_symbol = []
-            for i in range(8):
-                try:
-                    tok_addr = Address(input.functions.coins(i).call())
-                    token = Token(address=tok_addr)
-                    tokens.append(token)
-                    tokens_symbol.append(token.symbol)
-                    balances.append(token.scaled(input.functions.balances(i).call()))
-                    try:
-                        und = input.functions.underlying_coins(i).call()
-                        underlying.append(und)
-                        underlying_symbol.append(und.symbol)
-                    except (ABIFunctionNotFound, ContractLogicError):
-                        pass
-                except ContractLogicError:
-                    break
+            for coin, balance, underlying_coin in self.read_pool_coins(input):
+                token = get_erc20_token(self.context, Address(coin))
+                tokens.append(token)
+                tokens_symbol.append(
+                    get_token_symbol_decimals(self.context, token.address)[0])
+                balances.append(self.scaled(token, balance))
+                if underlying_coin is not None:
+                    und = get_erc20_token(self.context, Address(underlying_coin))
+                    underlying.append(und)
+                    underlying_symbol.append(
+                        get_token_symbol_decimals(self.context, und.address)[0])
+
+        if balances_token is None:
+            # ETH is read with Multicall3's getEthBalance in the same batch as the ERC20s
+            multicall = get_multicall(self.context)
+            balance_calls = []
+            for t in tokens:
+                if t.address == ETH_PSEUDO_ADDRESS and multicall is not None:
+                    balance_calls.append((multicall, 'getEthBalance', [input.address.checksum]))
+                else:
+                    balance_calls.append((t, 'balanceOf', [input.address.checksum]))
 
-        balances_token = [t.balance_of_scaled(input.address.checksum) for t in tokens]
+            balances_token = []
+            for t, (balance_ok, balance) in zip(tokens, try_calls(self.context, balance_calls)):
+                if not balance_ok:
+                    if t.address == ETH_PSEUDO_ADDRESS:
+                        balance = self.context.web3.eth.get_balance(input.address.checksum)
+                    else:
+                        balance = t.balance_of(input.address.checksum)
+                balances_token.append(self.scaled(t, balance))
 
         admin_fees = [bal_token-bal for bal, bal_token in zip(balances, balances_token)]
 
@@ -217,9 +360,9 @@ class CurveFinancePoolInfoTokens(Model):
 
         lp_token_addr = Address.null()
         lp_token_name = ''
-        try:
-            lp_token_addr = Address(registry.functions.get_lp_token(input.address).call())
-        except ABIFunctionNotFound:
+        if lp_token_ok:
+            lp_token_addr = Address(lp_token_raw)
+        else:
             try:
                 lp_token_addr = Address(input.functions.lp_token().call())
             except ABIFunctionNotFound:
@@ -267,7 +410,7 @@ class CurveFinancePoolInfoTokens(Model):
 
 
 @Model.describe(slug="curve-fi.pool-info",
-                version="1.25",
+                version="1.30",
                 display_name="Curve Finance Pool Liqudity",
                 description="The amount of Liquidity for Each Token in a Curve Pool",
                 category='protocol',
@@ -276,7 +419,7 @@ class CurveFinancePoolInfoTokens(Model):
                 output=CurveFiPoolInfo)
 class CurveFinancePoolInfo(Model):
     def run(self, input: Contract) -> CurveFiPoolInfo:
-        registry = Contract(**self.context.models.curve_fi.get_registry())
+        registry = get_registry(self.context)
         pool_info = self.context.run_model('curve-fi.pool-info-tokens',
                                            input,
                                            return_type=CurveFiPoolInfoToken)
@@ -299,20 +442,25 @@ class CurveFinancePoolInfo(Model):
                 return_type=Some[PriceWithQuote]).some
             return token_prices
 
-        token_prices = _use_for()
+        token_prices = _use_compose()
 
-        np_balance = np.array(pool_info.balances_token) * np.array([p.price for p in token_prices])
-        n_asset = np_balance.shape[0]
-        product_balance = np_balance.prod()
-        avg_balance = np_balance.mean()
+        # At most 8 coins, plain floats are cheaper than numpy arrays here
+        product_balance = 1.0
+        sum_balance = 0.0
+        for bal, token_price in zip(pool_info.balances_token, token_prices):
+            value = bal * token_price.price
+            product_balance *= value
+            sum_balance += value
+        n_asset = len(pool_info.balances_token)
+        avg_balance = sum_balance / n_asset
 
         # Calculating ratio, this gives information about peg
-        ratio = product_balance / np.power(avg_balance, n_asset)
+        ratio = product_balance / (avg_balance ** n_asset)
 
         try:
             virtual_price = pool_contract.functions.get_virtual_price().call()
         except Exception as _err:
-            virtual_price = (10**18)
+            virtual_price = VIRTUAL_PRICE_DEFAULT
 
         try:
             pool_A = pool_contract.functions.A().call()
@@ -322,7 +470,14 @@ class CurveFinancePoolInfo(Model):
         # Calculating 'chi'
         chi = pool_A * ratio
 
-        gauges, gauges_type = registry.functions.get_gauges(input.address.checksum).call()
+        (gauges_ok, gauges_info), (is_meta_ok, is_meta) = \
+            try_calls(self.context,
+                      [(registry, 'get_gauges', [input.address.checksum]),
+                       (registry, 'is_meta', [pool_contract.address.checksum])])
+        if not is_meta_ok:
+            is_meta = registry.functions.is_meta(pool_contract.address.checksum).call()
+
+        gauges, gauges_type = gauges_info if gauges_ok else ([], [])
         gauges = [Account(address=g) for g in gauges if not Address(g).is_null()]
         gauges_type = gauges_type[:len(gauges)]
 
@@ -335,7 +490,6 @@ class CurveFinancePoolInfo(Model):
                       for g, lp in zip(gauges, gauges.lp_tokens)
                       if lp.address == pool_info.lp_token_addr]
             gauges_type = [0] * len(gauges)
-        is_meta = registry.functions.is_meta(pool_contract.address.checksum).call()
 
         return CurveFiPoolInfo(**(pool_info.dict()),
                                token_prices=token_prices,
@@ -361,13 +515,10 @@ class CurveFinancePoolTVL(Model):
         pool_info = self.context.run_model('curve-fi.pool-info',
                                            input=input,
                                            return_type=CurveFiPoolInfo)
-        positions = []
-        tvl = 0.0
-        for tok, tok_price, bal in zip(pool_info.tokens.tokens,
-                                       pool_info.token_prices,
-                                       pool_info.balances):
-            positions.append(Position(amount=bal, asset=tok))
-            tvl += bal * tok_price.price
+        positions = [Position(amount=bal, asset=tok)
+                     for tok, bal in zip(pool_info.tokens.tokens, pool_info.balances)]
+        tvl = sum(bal * tok_price.price
+                  for tok_price, bal in zip(pool_info.token_prices, pool_info.balances))
 
         pool_name = pool_info.lp_token_name
 
@@ -444,7 +595,7 @@ class CurveFiAllGaugesOutput(Contracts):
 
 
 @Model.describe(slug="curve-fi.all-gauges",
-                version='1.3',
+                version='1.5',
                 display_name="Curve Finance Gauge List",
                 description="All Gauge Contracts for Curve Finance Pools",
                 category='protocol',
@@ -452,34 +603,47 @@ class CurveFiAllGaugesOutput(Contracts):
                 input=EmptyInput,
                 output=CurveFiAllGaugesOutput)
 class CurveFinanceAllGauges(Model):
+    GAUGE_BATCH_SIZE = 64
+
     def run(self, _) -> CurveFiAllGaugesOutput:
         gauge_controller = Contract(**self.context.models.curve_fi.get_gauge_controller())
+
+        n_gauges = gauge_controller.functions.n_gauges().call()
+        gauge_addrs = []
+        for i, (success, addr) in enumerate(
+                try_calls(self.context,
+                          [(gauge_controller, 'gauges', [i]) for i in range(n_gauges)],
+                          batch_size=self.GAUGE_BATCH_SIZE)):
+            if not success:
+                addr = gauge_controller.functions.gauges(i).call()
+            gauge_addrs.append(addr)
+
         gauges = []
-        lp_tokens = []
-        i = 0
-        while True:
-            addr = gauge_controller.functions.gauges(i).call()
-            if Address(addr).is_null():
-                break
+        for addr in gauge_addrs:
             gauge_contract = Contract(address=addr)
             gauges.append(gauge_contract)
-            i += 1
             try:
                 _ = gauge_contract.abi
             except ModelDataError:
                 gauge_contract._loaded = True  # pylint:disable=protected-access
                 gauge_contract.set_abi(GAUGE_ABI_LP_TOKEN)
-            try:
-                lp_token_addr = gauge_contract.functions.lp_token().call()
-                lp_tokens.append(Account(address=lp_token_addr))
-            except (BadFunctionCallOutput, ABIFunctionNotFound, ContractLogicError):
-                lp_tokens.append(Account(address=Address.null()))
+
+        lp_tokens = []
+        for gauge_contract, (success, lp_token_addr) in \
+                zip(gauges, try_calls(self.context, [(g, 'lp_token', []) for g in gauges])):
+            if not success:
+                try:
+                    lp_token_addr = gauge_contract.functions.lp_token().call()
+                except (BadFunctionCallOutput, ABIFunctionNotFound, ContractLogicError):
+                    lp_token_addr = Address.null()
+            lp_tokens.append(Account(address=lp_token_addr))
+
         return CurveFiAllGaugesOutput(contracts=gauges,
                                       lp_tokens=Accounts(accounts=lp_tokens))
 
 
 @Model.describe(slug='curve-fi.all-gauge-claim-addresses',
-                version='1.4',
+                version='1.6',
                 category='protocol',
                 subcategory='curve',
                 input=Contract,
@@ -487,44 +651,73 @@ class CurveFinanceAllGauges(Model):
 class CurveFinanceAllGaugeAddresses(Model):
     def run(self, input: Contract) -> Accounts:
         with self.context.ledger.Transaction as txn:
-            addrs = txn.select(
-                columns=[txn.FROM_ADDRESS],
-                where=txn.TO_ADDRESS.eq(input.address))
+            df_addrs = txn.select(
+                aggregates=[],
+                group_by=[txn.FROM_ADDRESS],
+                where=txn.TO_ADDRESS.eq(input.address)).to_dataframe()
+
+            if df_addrs.empty:
+                return Accounts(accounts=[])
 
             return Accounts(accounts=[
                 Account(address=address)
-                for address in
-                list(dict.fromkeys([
-                    a[txn.FROM_ADDRESS]
-                    for a
-                    in addrs]))])
+                for address in df_addrs[txn.FROM_ADDRESS].tolist()])
 
 
 @Model.describe(slug='curve-fi.get-gauge-stake-and-claimable-rewards',
-                version='1.2',
+                version='1.4',
                 category='protocol',
                 subcategory='curve',
                 input=Contract,
                 output=dict)
 class CurveFinanceGaugeRewardsCRV(Model):
-    def run(self, input: Contract) -> dict:
-        yields = []
+    MAX_WORKERS = 16
+    # claimable_tokens checkpoints the gauge, so batches are kept under the eth_call gas cap
+    MULTICALL_BATCH_SIZE = 300
 
+    def run(self, input: Contract) -> dict:
         all_addrs = Accounts(**self.context.models.curve_fi.all_gauge_claim_addresses(input))
         for addr in all_addrs.accounts:
             if not addr.address:
                 raise ModelRunError(f'Input is invalid, {input}')
 
+        # Build the ABI and web3 instance in this thread, which holds the model context,
+        # so the worker threads only issue eth_calls
+        _ = input.abi
+        _ = input.functions
+
+        fields = ['claimable_tokens', 'balanceOf', 'working_balances']
+        results = try_aggregate(self.context,
+                                [(input, field, [addr.address.checksum])
+                                 for addr in all_addrs.accounts
+                                 for field in fields],
+                                batch_size=self.MULTICALL_BATCH_SIZE)
+
+        def _stake_and_claimable(addr: Account) -> dict:
             claimable_tokens = input.functions.claimable_tokens(addr.address.checksum).call()
             balanceOf = input.functions.balanceOf(addr.address.checksum).call()
             working_balances = input.functions.working_balances(addr.address.checksum).call()
 
-            yields.append({
+            return {
                 "claimable_tokens": claimable_tokens,
                 "balanceOf": balanceOf,
                 "working_balances": working_balances,
                 "address": addr.address
-            })
+            }
+
+        if results is None:
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+                yields = list(executor.map(_stake_and_claimable, all_addrs.accounts))
+            return {"yields": yields}
+
+        yields = []
+        for n_addr, addr in enumerate(all_addrs.accounts):
+            row = results[n_addr * len(fields):(n_addr + 1) * len(fields)]
+            if all(success for success, _value in row):
+                yields.append({**{field: value for field, (_success, value) in zip(fields, row)},
+                               "address": addr.address})
+            else:
+                yields.append(_stake_and_claimable(addr))
 
         return {"yields": yields}
 
@@ -539,7 +732,7 @@ class CurveGaugeInput(DTO):
 
 
 @Model.describe(slug='curve-fi.gauge-yield',
-                version='1.3',
+                version='1.6',
                 category='protocol',
                 subcategory='curve',
                 input=Contract,
@@ -554,9 +747,7 @@ class CurveFinanceAverageGaugeYield(Model):
 
         lp_token_addr = input.functions.lp_token().call()
 
-        registry = self.context.run_model('curve-fi.get-registry',
-                                          input=EmptyInput(),
-                                          return_type=Contract)
+        registry = get_registry(self.context)
         pool_addr = registry.functions.get_pool_from_lp_token(lp_token_addr).call()
         if not Address(pool_addr).is_null():
             pool_info = self.context.run_model('curve-fi.pool-info', Contract(address=pool_addr))
@@ -575,8 +766,11 @@ class CurveFinanceAverageGaugeYield(Model):
             ),
             return_type=BlockSeries[dict])
 
-        yields = []
+        claimable_1 = []
+        claimable_2 = []
+        balance_1 = []
         for idx in range(0, len(res.series) - 1):
+            next_by_addr = {y2['address']: y2 for y2 in res.series[idx + 1].output['yields']}
             for y1 in res.series[idx].output['yields']:
                 if y1['working_balances'] == 0:
                     continue
@@ -584,30 +778,36 @@ class CurveFinanceAverageGaugeYield(Model):
                     continue
                 if y1['claimable_tokens'] == 0:
                     continue
-                for y2 in res.series[idx + 1].output['yields']:
-                    if y1['address'] == y2['address']:
-                        if y2['working_balances'] == 0:
-                            continue
-                        if y2['balanceOf'] == 0:
-                            continue
-                        if y2['claimable_tokens'] == 0:
-                            continue
-                        if y1['balanceOf'] == y2['balanceOf']:
-                            y2_rewards_value = y2["claimable_tokens"] * self.CRV_PRICE / (10**18)
-                            y1_rewards_value = y1["claimable_tokens"] * self.CRV_PRICE / (10**18)
-                            virtual_price = pool_virtual_price / (10**18) / (10**18)
-                            y2_liquidity_value = y2["balanceOf"] * virtual_price
-                            y1_liquidity_value = y1["balanceOf"] * virtual_price
-                            new_portfolio_value = y2_rewards_value + y2_liquidity_value
-                            old_portfolio_value = y1_rewards_value + y1_liquidity_value
-                            if old_portfolio_value > new_portfolio_value:
-                                break
-                            yields.append(
-                                (new_portfolio_value - old_portfolio_value) / old_portfolio_value)
-                            break
-        if len(yields) == 0:
+                y2 = next_by_addr.get(y1['address'])
+                if y2 is None:
+                    continue
+                if y2['working_balances'] == 0:
+                    continue
+                if y2['balanceOf'] == 0:
+                    continue
+                if y2['claimable_tokens'] == 0:
+                    continue
+                if y1['balanceOf'] == y2['balanceOf']:
+                    claimable_1.append(y1['claimable_tokens'])
+                    claimable_2.append(y2['claimable_tokens'])
+                    balance_1.append(y1['balanceOf'])
+
+        if len(balance_1) == 0:
+            return {}
+
+        # balanceOf is unchanged between the paired samples, so only the rewards value moves
+        claimable_1 = np.array(claimable_1, dtype=float)
+        claimable_2 = np.array(claimable_2, dtype=float)
+        balance_1 = np.array(balance_1, dtype=float)
+        crv_value = self.CRV_PRICE / WAD
+        virtual_price = pool_virtual_price / WAD / WAD
+        old_portfolio_value = claimable_1 * crv_value + balance_1 * virtual_price
+        yields = (claimable_2 - claimable_1) * crv_value / old_portfolio_value
+        yields = yields[yields >= 0]
+
+        if yields.shape[0] == 0:
             return {}
-        avg_yield = sum(yields) / len(yields) * (365 * 86400) / (10 * 86400)
+        avg_yield = float(yields.mean()) * (365 * 86400) / (10 * 86400)
         return {"crv_yield": avg_yield}
 
 
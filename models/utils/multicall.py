@@ -0,0 +1,146 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+from credmark.cmf.model.errors import ModelDataError
+from credmark.cmf.types import Address, Contract
+from eth_abi.exceptions import DecodingError
+from eth_utils.abi import collapse_if_tuple
+from hexbytes import HexBytes
+from models.tmp_abi_lookup import MULTICALL3_ABI
+from web3.exceptions import (ABIFunctionNotFound, BadFunctionCallOutput,
+                             ContractLogicError)
+
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# Smallest batch retried on its own after a tryAggregate eth_call over the node's limits
+MIN_BATCH_SIZE = 16
+
+# Node error messages for an eth_call over the gas cap or the response size limit
+BATCH_LIMIT_ERRORS = ('gas', 'too large', 'size')
+
+# chain_id => first block with Multicall3 deployed
+MULTICALL3_DEPLOYED_BLOCK = {
+    1: 14353601,
+}
+
+
+def get_multicall(context) -> Optional[Contract]:
+    """
+    Multicall3 contract for the context's chain and block, None if not yet deployed.
+    """
+    deployed_block = MULTICALL3_DEPLOYED_BLOCK.get(context.chain_id)
+    if deployed_block is None or context.block_number < deployed_block:
+        return None
+    return Contract(address=Address(MULTICALL3_ADDRESS).checksum, abi=MULTICALL3_ABI)
+
+
+def get_function_abi(contract: Contract, fn_name: str):
+    """
+    (web3 contract, function ABI) for fn_name, looking in the implementation's ABI first
+    for a proxy, as contract.functions does; (None, None) if the function is not found.
+    """
+    for abi_contract in (contract.proxy_for, contract):
+        if abi_contract is None:
+            continue
+        try:
+            instance = abi_contract.instance
+            return instance, instance.get_function_by_name(fn_name).abi
+        except (ModelDataError, ValueError):
+            continue
+    return None, None
+
+
+def _is_batch_limit_error(err: Exception) -> bool:
+    if isinstance(err, BadFunctionCallOutput):
+        # empty return data from Multicall3 itself: the eth_call ran out of gas
+        return True
+    message = err.args[0] if len(err.args) > 0 else ''
+    if isinstance(message, dict):
+        message = message.get('message', '')
+    return any(limit in str(message).lower() for limit in BATCH_LIMIT_ERRORS)
+
+
+def _try_aggregate_batch(multicall: Contract, payload: list) -> list:
+    """
+    tryAggregate one batch; when the eth_call itself is over the node's gas cap or
+    response size limit, retry in halves down to MIN_BATCH_SIZE.
+    Any other error (rate limit, timeout, node error) is raised.
+    """
+    try:
+        return multicall.functions.tryAggregate(False, payload).call()
+    except (BadFunctionCallOutput, ValueError) as err:
+        if len(payload) <= MIN_BATCH_SIZE or not _is_batch_limit_error(err):
+            raise
+        half = len(payload) // 2
+        return (_try_aggregate_batch(multicall, payload[:half]) +
+                _try_aggregate_batch(multicall, payload[half:]))
+
+
+def try_aggregate(context,
+                  calls: Sequence[Tuple[Contract, str, list]],
+                  batch_size: Optional[int] = None) -> Optional[List[Tuple[bool, Any]]]:
+    """
+    Run the (contract, function name, args) calls in one eth_call with Multicall3.tryAggregate,
+    or one eth_call per batch_size calls to stay under the node's gas cap for heavy calls.
+
+    Returns (success, value) for each call in order; value is None for a failed call
+    or a function missing from the contract's ABI, the single decoded output for
+    one-output functions, or a tuple otherwise.
+    Returns None when Multicall3 is unavailable so that the caller can fall back.
+    """
+    multicall = get_multicall(context)
+    if multicall is None:
+        return None
+
+    payload = []
+    output_types = []
+    for contract, fn_name, args in calls:
+        instance, fn_abi = get_function_abi(contract, fn_name)
+        if instance is None:
+            output_types.append(None)
+            continue
+        payload.append((contract.address.checksum,
+                        HexBytes(instance.encodeABI(fn_name=fn_name, args=args))))
+        output_types.append([collapse_if_tuple(out) for out in fn_abi['outputs']])
+
+    results = []
+    if len(payload) > 0:
+        step = len(payload) if batch_size is None else batch_size
+        for start in range(0, len(payload), step):
+            results.extend(_try_aggregate_batch(multicall, payload[start:start + step]))
+    results = iter(results)
+
+    decoded = []
+    for types in output_types:
+        if types is None:
+            decoded.append((False, None))
+            continue
+        success, return_data = next(results)
+        if not success or len(return_data) == 0:
+            decoded.append((False, None))
+            continue
+        try:
+            value = context.web3.codec.decode_abi(types, return_data)
+        except DecodingError:
+            decoded.append((False, None))
+            continue
+        decoded.append((True, value[0] if len(value) == 1 else value))
+    return decoded
+
+
+def try_calls(context,
+              calls: Sequence[Tuple[Contract, str, list]],
+              batch_size: Optional[int] = None) -> List[Tuple[bool, Any]]:
+    """
+    Same as try_aggregate, with one eth_call per call when Multicall3 is unavailable.
+    """
+    results = try_aggregate(context, calls, batch_size)
+    if results is not None:
+        return results
+
+    results = []
+    for contract, fn_name, args in calls:
+        try:
+            results.append((True, getattr(contract.functions, fn_name)(*args).call()))
+        except (ABIFunctionNotFound, BadFunctionCallOutput, ContractLogicError):
+            results.append((False, None))
+    return results
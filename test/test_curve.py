@@ -93,8 +93,13 @@ class TestCurve(CMKTest):
         # 0x72E158d38dbd50A483501c24f792bDAAA3e7D55C is Curve.fi FRAX3CRV-f Gauge Deposit (FRAX3CRV-...)
         self.run_model('curve-fi.all-gauge-claim-addresses', {"address": "0x72E158d38dbd50A483501c24f792bDAAA3e7D55C"})
 
-        # TODO
-        # self.run_model('curve-fi.all-gauges', {}' curve-fi.get-gauge-controller
+        # Before Multicall3 (block 14353601): per-staker reads go through the thread pool
+        self.run_model('curve-fi.gauge-yield', {"address": "0x72E158d38dbd50A483501c24f792bDAAA3e7D55C"},
+                       block_number=14000000)
+
+        self.run_model('curve-fi.all-gauges', {})  # curve-fi.get-gauge-controller
+        # Before Multicall3 (block 14353601): gauges(i) are read one index at a time
+        self.run_model('curve-fi.all-gauges', {}, block_number=14000000)
 
     def test_pool_info(self):
         block_number = 15311050